@@ -0,0 +1,93 @@
+#: src/batch.py -- batched header reads across many files.
+
+import os
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Union
+
+from .source import ByteSource, FileSource
+
+try:
+    import liburing #: Optional -- only used on Linux when installed.
+except ImportError:
+    liburing = None
+
+#: Enough to cover the header and the first few chunk headers of IFF/RIFF/W64 files.
+DEFAULT_HEADER_SIZE = 4096
+#: Number of reads submitted to the ring at once.
+DEFAULT_QUEUE_DEPTH = 64
+
+URING_AVAILABLE = sys.platform == "linux" and liburing is not None
+
+class UringBatchSource():
+    """Reads the leading bytes of many files concurrently, yielding a `ByteSource` per file."""
+    def __init__(self, queue_depth: int = DEFAULT_QUEUE_DEPTH):
+        self._queue_depth = queue_depth
+
+    def read_headers(self, paths: Iterable[Union[Path, str]], header_size: int = DEFAULT_HEADER_SIZE) -> List[ByteSource]:
+        """Reads up to `header_size` bytes from the start of each path, preserving order."""
+        paths = list(paths)
+        if URING_AVAILABLE:
+            return self._read_headers_uring(paths, header_size)
+        return self._read_headers_threaded(paths, header_size)
+
+    def _read_headers_uring(self, paths: List[Union[Path, str]], header_size: int) -> List[ByteSource]:
+        """Submits one read per file and waits for the whole batch with a single enter."""
+        try:
+            ring = liburing.Ring()
+            cqe = liburing.Cqe()
+            liburing.io_uring_queue_init(self._queue_depth, ring)
+        except (AttributeError, OSError): #: Incompatible bindings, or io_uring disabled by the kernel/sandbox.
+            return self._read_headers_threaded(paths, header_size)
+
+        sources = []
+        try:
+            for batch_start in range(0, len(paths), self._queue_depth):
+                batch = paths[batch_start:batch_start + self._queue_depth]
+                buffers = [bytearray(header_size) for _ in batch]
+                lengths = [0] * len(batch)
+                fds = []
+                try:
+                    for path in batch:
+                        fds.append(os.open(path, os.O_RDONLY))
+
+                    file_index = liburing.FileIndex(fds) #: Must stay referenced until the batch completes.
+                    liburing.io_uring_register_files(ring, file_index)
+                    try:
+                        for index, buffer in enumerate(buffers):
+                            sqe = liburing.io_uring_get_sqe(ring)
+                            liburing.io_uring_prep_read(sqe, index, buffer, 0) #: `index` refers to the registered fd.
+                            liburing.io_uring_sqe_set_flags(sqe, liburing.IOSQE_FIXED_FILE)
+                            liburing.io_uring_sqe_set_data64(sqe, index)
+
+                        liburing.io_uring_submit_and_wait(ring, len(batch))
+                        for _ in batch:
+                            liburing.io_uring_wait_cqe(ring, cqe)
+                            entry = cqe[0]
+                            lengths[liburing.io_uring_cqe_get_data64(entry)] = liburing.trap_error(entry.res)
+                            liburing.io_uring_cqe_seen(ring, entry)
+                    finally:
+                        liburing.io_uring_unregister_files(ring)
+                finally:
+                    for fd in fds:
+                        os.close(fd)
+
+                sources.extend(ByteSource(bytes(buffer[:length])) for buffer, length in zip(buffers, lengths))
+        finally:
+            liburing.io_uring_queue_exit(ring)
+
+        return sources
+
+    def _read_headers_threaded(self, paths: List[Union[Path, str]], header_size: int) -> List[ByteSource]:
+        """Fallback for platforms without io_uring."""
+        def read_header(path: Union[Path, str]) -> ByteSource:
+            source = FileSource(path, buffer_size=header_size)
+            try:
+                return ByteSource(source.read(header_size))
+            finally:
+                source.close()
+
+        with ThreadPoolExecutor(max_workers=self._queue_depth) as executor:
+            return list(executor.map(read_header, paths))
@@ -1,6 +1,9 @@
 #: src/common.py
 
-from typing import Literal
+from dataclasses import dataclass
+from functools import lru_cache
+from struct import Struct
+from typing import Dict, Literal
 
 #: TODO: Sort this file properly.
 
@@ -13,6 +16,13 @@ MMX_LE = "little"
 
 FOURCC_ENCODING = "ascii"
 
+#: Struct byte order and size field format characters; other size field lengths have no Struct equivalent.
+_STRUCT_BYTE_ORDERS = {MMX_LE: "<", MMX_BE: ">"}
+_SIZE_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+#: Payloads below this size are read together with their alignment padding, trading a small copy for a seek.
+FOLD_PADDING_LIMIT = 4096
+
 #: Encodings
 LATIN = "latin-1"
 
@@ -25,3 +35,54 @@ W64_ALIGNMENT = 8
 W64_OVERHEAD = 24
 W64_IDENTIFIER_LENGTH = 16
 W64_SIZE_LENGTH = 8
+
+RF64_HEADER_LENGTH = 12 #: 'RF64', placeholder size, form type.
+DS64_HEADER_LENGTH = 8
+DS64_FIXED_LENGTH = 28 #: RIFF size, data size, sample count (8 bytes each) and table length (4 bytes).
+DS64_TABLE_ENTRY_LENGTH = 12 #: Chunk identifier and 8 byte size.
+RF64_SIZE_PLACEHOLDER = 0xFFFFFFFF #: Size field value meaning "look it up in 'ds64'".
+#: RF64 header, 'ds64' identifier and size, and the fixed 'ds64' fields, unpacked together.
+RF64_DS64 = Struct("<4s4s4s4sIQQQI")
+DS64_TABLE_ENTRY = Struct("<4sQ")
+
+#: Helpers
+def guid_le_to_str(guid_bytes: bytes) -> str:
+    """Formats a 16 byte little-endian GUID as an uppercase string, without constructing a `uuid.UUID`."""
+    if len(guid_bytes) != 16:
+        raise ValueError(f"GUID must be 16 bytes, got {len(guid_bytes)}.") #: Matches `uuid.UUID(bytes_le=...)`.
+    return f"{guid_bytes[3::-1].hex()}-{guid_bytes[5:3:-1].hex()}-{guid_bytes[7:5:-1].hex()}-{guid_bytes[8:10].hex()}-{guid_bytes[10:16].hex()}".upper()
+
+
+@dataclass(slots=True)
+class RF64Header:
+    """The RF64 header and the sizes declared by its 'ds64' chunk."""
+    master: str
+    form: str
+    riff_size: int
+    data_size: int
+    table_size: int #: Bytes of 'ds64' size table following the fixed fields, in whole entries.
+    chunks_offset: int #: Offset of the first chunk after 'ds64', relative to the header.
+
+def parse_rf64_header(header: bytes) -> RF64Header:
+    """Decodes the `RF64_DS64.size` bytes at the start of an RF64 source. Raises `ValueError` if 'ds64' is not next."""
+    master, _, form, ds64_identifier, ds64_size, riff_size, data_size, _, table_length = RF64_DS64.unpack(header)
+    if ds64_identifier != b"ds64" or ds64_size < DS64_FIXED_LENGTH:
+        raise ValueError("RF64 source is missing a valid 'ds64' chunk.")
+
+    table_size = min(table_length * DS64_TABLE_ENTRY_LENGTH, ds64_size - DS64_FIXED_LENGTH) #: Never past the end of 'ds64'.
+    table_size -= table_size % DS64_TABLE_ENTRY_LENGTH
+    chunks_offset = RF64_HEADER_LENGTH + DS64_HEADER_LENGTH + ds64_size + (-ds64_size & (IFF_ALIGNMENT - 1))
+    return RF64Header(master.decode(LATIN), form.decode(LATIN), riff_size, data_size, table_size, chunks_offset)
+
+def parse_ds64_table(table: bytes) -> Dict[str, int]:
+    """Decodes `RF64Header.table_size` bytes of 'ds64' size table into sizes keyed by chunk identifier."""
+    return {identifier.decode(LATIN): size for identifier, size in DS64_TABLE_ENTRY.iter_unpack(table)}
+
+@lru_cache(maxsize=None)
+def field_struct(endian: Endian, identifier_length: int, size_length: int) -> Struct:
+    """Returns a Struct unpacking an identifier followed by a size field, or only the size when `identifier_length` is 0."""
+    byte_order = _STRUCT_BYTE_ORDERS.get(endian)
+    size_format = _SIZE_FORMATS.get(size_length)
+    if byte_order is None or size_format is None:
+        raise ValueError(f"Unsupported field layout: endian {endian!r} with a {size_length} byte size field. Size fields must be {sorted(_SIZE_FORMATS)} bytes.")
+    return Struct(f"{byte_order}{identifier_length}s{size_format}" if identifier_length else f"{byte_order}{size_format}")
@@ -1,17 +1,30 @@
 #: container.py: Utility for reading different container formats.
-import uuid
+import sys
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
-from .common import Endian, MMX_BE, MMX_LE, FOURCC_ENCODING, IFF_ALIGNMENT, IFF_IDENTIFIER_LENGTH, IFF_SIZE_LENGTH, W64_ALIGNMENT, W64_OVERHEAD, W64_IDENTIFIER_LENGTH, W64_SIZE_LENGTH
-from .source import ReadableSource
+from .common import Endian, MMX_BE, MMX_LE, FOURCC_ENCODING, IFF_ALIGNMENT, IFF_IDENTIFIER_LENGTH, IFF_SIZE_LENGTH, W64_ALIGNMENT, W64_OVERHEAD, W64_IDENTIFIER_LENGTH, W64_SIZE_LENGTH, RF64_HEADER_LENGTH, RF64_SIZE_PLACEHOLDER, RF64_DS64, FOLD_PADDING_LIMIT, field_struct, guid_le_to_str, parse_ds64_table, parse_rf64_header
+from .source import ByteSource, MmapSource, ReadableSource
+from .walker import walk
+
+try:
+    import numpy as np #: Optional -- only needed for `GenericContainer.read_index`.
+except ImportError:
+    np = None
+
+#: Interned FourCC strings keyed by their raw bytes. Bounded since identifiers come from untrusted input.
+_FOURCC_CACHE: Dict[bytes, str] = {}
+_FOURCC_CACHE_LIMIT = 256
+
+#: Record layout returned by `GenericContainer.read_index`.
+INDEX_DTYPE = [("off", "<u8"), ("size", "<u8"), ("id", "<u4")]
 
 #:
 #: Utility for reading IFF, RIFF, RIFX, RF64, W64, BWF, AIFF,
 #:
 
-@dataclass
+@dataclass(slots=True)
 class ContainerStructure:
     """The layout and characteristics needed to read a container."""
     format: str
@@ -33,15 +46,25 @@ RF64_STRUCTURE = ContainerStructure("RF64", chunk_size_storage={})
 #: Utilizes 16-byte GUIDs as identifiers and 8 byte size fields. Size field includes 16 byte identifier and 8 byte size, resulting in a 24 byte overhead to account for.
 W64_STRUCTURE  = ContainerStructure("W64", identifier_length=W64_IDENTIFIER_LENGTH, payload_size_length=W64_SIZE_LENGTH, alignment=W64_ALIGNMENT, overhead=W64_OVERHEAD)
 
-@dataclass
+#: Slotted dataclasses throughout: no per-instance `__dict__`, which matters once a container holds thousands of chunks.
+@dataclass(slots=True)
 class Chunk:
     """A generic chunk within a container."""
     identifier: str
     size: int
-    payload: bytes = field(repr=False) #: Don't print unparsed payload.
+    payload: Optional[Union[bytes, memoryview]] = field(repr=False) #: Don't print unparsed payload. A view into the map for `MmapSource`, None when read lazily.
     start: int
+    payload_offset: int = 0
 
-@dataclass
+    def load(self, source: ReadableSource) -> Union[bytes, memoryview]:
+        """Reads the payload from source if it was deferred."""
+        if self.payload is None:
+            offset = source.tell() #: Restored so loading mid-iteration doesn't move the next chunk read.
+            self.payload = source.read_at_offset(self.payload_offset, self.size)
+            source.seek(offset)
+        return self.payload
+
+@dataclass(slots=True)
 class ContainerInfo:
     """Stores header information and chunks from parsed container."""
     master: str
@@ -53,84 +76,180 @@ class ContainerInfo:
 class EOSError(Exception):
     """Raised when source does not contain enough bytes for reading."""
 
+class InvalidContainerError(Exception):
+    """Raised when source does not match the expected container structure."""
+
+def identifier_id(identifier: str) -> int:
+    """Returns the `id` used by `GenericContainer.read_index`: the first four identifier bytes read big-endian."""
+    if len(identifier) == 36: #: GUID string, whose first group holds the first four bytes reversed.
+        return int.from_bytes(bytes.fromhex(identifier[:8])[::-1], "big")
+    return int.from_bytes(identifier.encode(FOURCC_ENCODING)[:4], "big")
+
 class GenericContainer():
     """Generic parser for generic container formats."""
-    def __init__(self, source: ReadableSource, structure: ContainerStructure, start: int = 0):
+    def __init__(self, source: ReadableSource, structure: ContainerStructure, start: int = 0, lazy: bool = False):
         self._source = source
         self._structure = structure
         self._start = start
+        self._lazy = lazy #: Skip payloads, leaving them to `Chunk.load`.
+
+        #: Hoisted from `structure` since they are consulted for every chunk.
+        self._id_len = structure.identifier_length
+        self._sz_len = structure.payload_size_length
+        self._align = structure.alignment
+        self._overhead = structure.overhead
+        self._endian_str = structure.endian
+        self._is_big_endian = self._endian_str == MMX_BE
+        self._field_size = self._id_len + self._sz_len
+        self._source_len = len(source) #: Sources are read-only, so their length is fixed.
+        size_struct = field_struct(self._endian_str, 0, self._sz_len) #: Raises `ValueError` for unsupported layouts.
+        self._size_unpack = size_struct.unpack
+        self._size_unpack_from = size_struct.unpack_from
+        #: RF64 keeps the real size of oversized chunks in `ds64`. Copied so `read_rf_header` never fills the shared structure.
+        self._chunk_size_storage = dict(structure.chunk_size_storage or {})
+        self._oversized_get = self._chunk_size_storage.get
 
-        self._source.reset()
+        self._source.seek(self._start) #: Honour the caller's offset rather than rewinding to 0.
+
+        if isinstance(self._source, MmapSource):
+            #: Mapped sources hand out views into the map instead of copies.
+            self._read_payload_bytes = self._source.read_view
+            self._read_fields = self._source.read_view
+        else:
+            self._read_payload_bytes = self._source.read
+            self._read_fields = self._source.read
 
         if self._structure.format == "W64":
             self.read_identifier = self.read_guid
+            self.parse_identifier = self.parse_guid
         else:
             self.read_identifier = self.read_generic_identifier
+            self.parse_identifier = self.parse_generic_identifier
 
         if self._structure.format == "RF64":
             self.read_header = self.read_rf_header
         else:
             self.read_header = self.read_generic_header
 
+        self.read_chunk = self._make_read_chunk(self._lazy)
+
         self._chunks = []
 
-    def align_source(self, payload_size: int):
-        """Seeks forward to align the source for next read."""
-        padding = (self._structure.alignment - (payload_size % self._structure.alignment)) % self._structure.alignment
-        if padding:
-            self._source.seek(padding, 1)
+    def parse_generic_identifier(self, identifier_bytes: bytes) -> str:
+        """Decodes an identifier from already-read bytes."""
+        identifier = _FOURCC_CACHE.get(identifier_bytes) #: Read-only views hash like bytes, so only copy on a miss.
+        if identifier is None:
+            raw = bytes(identifier_bytes)
+            identifier = sys.intern(raw.decode(FOURCC_ENCODING))
+            if len(_FOURCC_CACHE) < _FOURCC_CACHE_LIMIT:
+                _FOURCC_CACHE[raw] = identifier
+        return identifier
+
+    def parse_guid(self, guid_bytes: bytes) -> str:
+        """Decodes a GUID identifier from already-read bytes."""
+        return guid_le_to_str(guid_bytes)
 
     def read_generic_identifier(self) -> str:
         """Reads an identifier from source."""
-        return self._source.read(self._structure.identifier_length).decode(FOURCC_ENCODING)
+        return self.parse_generic_identifier(self._read_fields(self._id_len))
 
     def read_guid(self) -> str:
         """Reads a GUID identifier from source."""
-        guid_bytes = self._source.read(self._structure.identifier_length)
-        return str(uuid.UUID(bytes_le=guid_bytes)).upper() #: Uppercase for GUID consistency.
+        return self.parse_guid(self._read_fields(self._id_len))
+
+    def parse_size(self, size_bytes: bytes) -> int:
+        """Decodes a header or chunk size from already-read bytes and accounts for overhead."""
+        return self._size_unpack(size_bytes)[0] - self._overhead #: Account for w64
 
     def read_size(self) -> int:
         """Reads a header or chunk size from source and accounts for overhead."""
-        size_bytes = self._source.read(self._structure.payload_size_length)
-        return int.from_bytes(size_bytes, byteorder=self._structure.endian) - self._structure.overhead #: Account for w64
-
-    def read_payload(self, payload_size: int) -> bytes:
-        """Reads the payload data of a chunk."""
-        return self._source.read(payload_size)
+        return self.parse_size(self._read_fields(self._sz_len))
 
     def read_generic_header(self) -> Tuple[str, int, str]:
         """Reads the container header."""
-        master = self.read_identifier(); size = self.read_size();form = self.read_identifier()
+        id_len = self._id_len
+        size_end = self._field_size
+        offset = self._source.tell()
+        if offset + size_end + id_len > self._source_len:
+            raise EOSError(f"Not enough bytes to read container header at {offset}. Remaining bytes in source: {self._source_len - offset}")
+
+        header = memoryview(self._read_fields(size_end + id_len)) #: master, size and form in one read.
+        master = self.parse_identifier(header[:id_len])
+        size = self._size_unpack_from(header, id_len)[0] - self._overhead
+        form = self.parse_identifier(header[size_end:])
         return master, size, form
 
     def read_rf_header(self) -> Tuple[str, int, str]:
-        """Reads the RF64 container header and the following [ds64] chunk."""
-        #: TODO: Read header and `ds64`
-        return ()
-
-    def ensure_fields_room(self, offset: int):
-        """Ensure enough bytes remain to read identifier and size fields."""
-        required_field_size = self._structure.identifier_length + self._structure.payload_size_length
-        if offset + required_field_size > len(self._source):
-            raise EOSError(f"Not enough bytes to read identifier and/or size fields at {offset}. Remaining bytes in source: {len(self._source) - offset}")
-
-    def ensure_payload_room(self, payload_size: int, offset: int):
-        """Ensures enough bytes remain to read payload."""
-        if offset + payload_size > len(self._source):
-            raise EOSError(f"Not enough bytes to read payload of size {payload_size} at {offset}. Remaining bytes in source: {len(self._source) - offset}")
-
-    def read_chunk(self) -> Chunk:
-        """Reads the chunk at the current offset."""
-        start_offset = self._source.tell()
-        self.ensure_fields_room(start_offset)
-        identifier = self.read_identifier(); payload_size = self.read_size(); post_field_offset = self._source.tell()
-        self.ensure_payload_room(payload_size, post_field_offset)
-        payload = self.read_payload(payload_size)
-        self.align_source(payload_size) #: Align for next chunk read. Otherwise, we are at or beyond EOS.
-        return Chunk(identifier, payload_size, payload, start_offset)
+        """Reads the RF64 container header and the following [ds64] chunk, storing the sizes it lists."""
+        offset = self._source.tell()
+        if offset + RF64_DS64.size > self._source_len:
+            raise EOSError(f"Not enough bytes to read RF64 header and [ds64] at {offset}. Remaining bytes in source: {self._source_len - offset}")
+
+        try:
+            header = parse_rf64_header(self._read_fields(RF64_DS64.size)) #: Header, [ds64] fields and its fixed body in one read.
+        except ValueError as error:
+            raise InvalidContainerError(f"RF64 source is missing a valid [ds64] chunk at {offset + RF64_HEADER_LENGTH}.") from error
+
+        self._chunk_size_storage["data"] = header.data_size
+        if header.table_size:
+            if offset + RF64_DS64.size + header.table_size > self._source_len:
+                raise EOSError(f"Not enough bytes to read [ds64] table of size {header.table_size} at {offset + RF64_DS64.size}. Remaining bytes in source: {self._source_len - offset - RF64_DS64.size}")
+            self._chunk_size_storage.update(parse_ds64_table(self._read_fields(header.table_size)))
+
+        self._source.seek(offset + header.chunks_offset)
+        return header.master, header.riff_size, header.form
+
+    def _make_read_chunk(self, lazy: bool) -> Callable[[], Chunk]:
+        """Builds a `read_chunk` specialized for this container, with everything it needs bound as locals."""
+        read_fields = self._read_fields
+        source_tell = self._source.tell
+        source_seek = self._source.seek
+        source_len = self._source_len
+        parse_identifier = self.parse_identifier
+        size_unpack_from = self._size_unpack_from
+        oversized_get = self._oversized_get
+        read_payload_bytes = None if lazy else self._read_payload_bytes
+        id_len = self._id_len
+        field_size = self._field_size
+        align_mask = self._align - 1 #: Alignments are powers of two (2 or 8).
+        overhead = self._overhead
+
+        def read_chunk() -> Chunk:
+            """Reads the chunk at the current offset."""
+            start_offset = source_tell()
+            if start_offset + field_size > source_len:
+                raise EOSError(f"Not enough bytes to read identifier and/or size fields at {start_offset}. Remaining bytes in source: {source_len - start_offset}")
+
+            fields = memoryview(read_fields(field_size)) #: Identifier and size in one read.
+            identifier = parse_identifier(fields[:id_len])
+            payload_size = size_unpack_from(fields, id_len)[0]
+            if payload_size == RF64_SIZE_PLACEHOLDER: #: Only placeholder sizes defer to [ds64].
+                payload_size = oversized_get(identifier, payload_size)
+            payload_size -= overhead
+
+            post_field_offset = start_offset + field_size
+            if post_field_offset + payload_size > source_len:
+                raise EOSError(f"Not enough bytes to read payload of size {payload_size} at {post_field_offset}. Remaining bytes in source: {source_len - post_field_offset}")
+
+            padding = -payload_size & align_mask #: Align for next chunk read. Otherwise, we are at or beyond EOS.
+            if read_payload_bytes is None: #: Lazy, leave the payload to `Chunk.load`.
+                payload = None
+                source_seek(payload_size + padding, 1)
+            elif padding and payload_size < FOLD_PADDING_LIMIT and post_field_offset + payload_size + padding <= source_len:
+                payload = read_payload_bytes(payload_size + padding)[:payload_size] #: Read through the padding rather than seeking past it.
+            else:
+                payload = read_payload_bytes(payload_size)
+                if padding:
+                    source_seek(padding, 1)
+
+            return Chunk(identifier, payload_size, payload, start_offset, post_field_offset)
+
+        return read_chunk
 
     def read_all(self) -> ContainerInfo:
         """Reads header and all chunks from the container."""
+        if self._source.tell() != self._start:
+            self._source.seek(self._start)
         master, eos, form = self.read_header()
         while (self._source.tell() < eos): #: Opt for header eos rather than len(self._source)
             try:
@@ -141,3 +260,43 @@ class GenericContainer():
             self._chunks.append(chunk)
 
         return ContainerInfo(master, eos, form, self._chunks, self._structure)
+
+    def read_index(self) -> "np.ndarray":
+        """
+        Reads the header and returns an `INDEX_DTYPE` array of (offset, size, id) for every chunk, without payloads.
+
+        Find a chunk with e.g. `index[index["id"] == identifier_id("data")]`.
+        """
+        if np is None:
+            raise ImportError("GenericContainer.read_index requires numpy.")
+
+        if self._source.tell() != self._start:
+            self._source.seek(self._start)
+        _, eos, _ = self.read_header()
+
+        walked = np.empty(0, dtype=INDEX_DTYPE)
+        if isinstance(self._source, (ByteSource, MmapSource)): #: Walk in-memory headers in bulk, then finish anything the walker left below.
+            buffer = self._source.getbuffer()
+            chunks, stop_offset = walk(buffer, self._source.tell(), self._id_len, self._sz_len, self._align, self._overhead, not self._is_big_endian)
+            records = np.array(chunks, dtype=np.uint64).reshape(-1, 2)
+            records = records[records[:, 0] < eos] #: Opt for header eos rather than len(self._source)
+            data = np.frombuffer(buffer, dtype=np.uint8)
+            offsets = records[:, 0].astype(np.intp)
+            walked = np.empty(len(records), dtype=INDEX_DTYPE)
+            walked["off"] = records[:, 0]
+            walked["size"] = records[:, 1] - self._overhead
+            walked["id"] = (data[offsets].astype(np.uint32) << 24) | (data[offsets + 1].astype(np.uint32) << 16) | (data[offsets + 2].astype(np.uint32) << 8) | data[offsets + 3]
+            self._source.seek(stop_offset)
+
+        #: Same loop as `read_all`, so chunks the walker stops at (RF64 placeholders, a field-only tail, malformed sizes) are handled identically.
+        read_chunk = self._make_read_chunk(True)
+        records = []
+        while (self._source.tell() < eos):
+            try:
+                chunk = read_chunk()
+            except EOSError:
+                break
+
+            records.append((chunk.start, chunk.size, identifier_id(chunk.identifier)))
+
+        return np.concatenate([walked, np.array(records, dtype=INDEX_DTYPE)])
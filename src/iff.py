@@ -1,33 +1,45 @@
 #: src/iff.py -- functions for reading chunks from iff/riff-based formats.
 
-import uuid
+import os
 
 from dataclasses import dataclass, field
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
-from .common import Endian, LATIN, IFF_ALIGNMENT, IFF_IDENTIFIER_LENGTH, IFF_SIZE_LENGTH, W64_IDENTIFIER_LENGTH, W64_SIZE_LENGTH, W64_OVERHEAD
-from .source import ReadableSource
+from .common import Endian, MMX_BE, MMX_LE, LATIN, IFF_ALIGNMENT, IFF_IDENTIFIER_LENGTH, IFF_SIZE_LENGTH, W64_IDENTIFIER_LENGTH, W64_SIZE_LENGTH, W64_OVERHEAD, RF64_HEADER_LENGTH, RF64_SIZE_PLACEHOLDER, RF64_DS64, FOLD_PADDING_LIMIT, field_struct, guid_le_to_str, parse_ds64_table, parse_rf64_header
+from .source import ByteSource, MmapSource, ReadableSource
+from .walker import walk
 
 #: Match containers to their endianness.
 CONTAINER_ENDIANNESS = {
-    "FORM": ("big", "IFF"), "RIFX": ("big", "RIFF"), "FFIR": ("big", "RIFF"),
-    "RF64": ("little", "RF64"), "riff": ("little", "W64"), "RIFF": ("little", "RIFF"),
+    "FORM": (MMX_BE, "IFF"), "RIFX": (MMX_BE, "RIFF"), "FFIR": (MMX_BE, "RIFF"),
+    "RF64": (MMX_LE, "RF64"), "riff": (MMX_LE, "W64"), "RIFF": (MMX_LE, "RIFF"),
 }
 
 class EOSError(Exception): ...
 
 class InvalidContainerError(Exception): ...
 
-@dataclass
+#: Slots keep each chunk to a fixed attribute table (~88 B here vs ~350 B with a `__dict__` on CPython 3.11).
+@dataclass(slots=True)
 class Chunk:
     """A generic chunk."""
     identifier: str
     size: int
-    payload: bytes
+    payload: Optional[Union[bytes, memoryview]] #: A view into the map for `MmapSource`, None when read lazily.
     start: int
     end: int
-
-@dataclass
+    payload_offset: int = 0
+    payload_length: int = 0
+
+    def load(self, source: ReadableSource) -> Union[bytes, memoryview]:
+        """Reads the payload from source if it was deferred."""
+        if self.payload is None:
+            offset = source.tell() #: Restored so loading mid-iteration doesn't move the next chunk read.
+            self.payload = source.read_at_offset(self.payload_offset, self.payload_length)
+            source.seek(offset)
+        return self.payload
+
+@dataclass(slots=True)
 class ContainerMetadata:
     master: str
     endian: Endian
@@ -35,7 +47,7 @@ class ContainerMetadata:
     form_type: str
     size: int
 
-@dataclass
+@dataclass(slots=True)
 class ContainerLayout:
     endian: Endian
     encoding: str = LATIN
@@ -45,16 +57,16 @@ class ContainerLayout:
     overhead: int = 0
     chunk_size_storage: Dict[str, int] = field(default_factory=dict)
 
-@dataclass
+@dataclass(slots=True)
 class ContainerInfo:
     metadata: ContainerMetadata
     layout: ContainerLayout
 
 #: Helper functions for 'derive_container_info()'
 def _parse_w64_header(source: ReadableSource, endian: Endian, container_type: str, start: int) -> ContainerInfo:
-    source.reset()
+    source.seek(start)
     master_bytes = source.read(W64_IDENTIFIER_LENGTH)
-    master = str(uuid.UUID(bytes_le=master_bytes)).upper() #: Uppercase for GUID consistency.
+    master = guid_le_to_str(master_bytes)
     size_bytes = source.read(W64_SIZE_LENGTH)
     size = int.from_bytes(size_bytes, byteorder=endian) - W64_OVERHEAD
     form_bytes = source.read(W64_IDENTIFIER_LENGTH)
@@ -62,8 +74,37 @@ def _parse_w64_header(source: ReadableSource, endian: Endian, container_type: st
 
     return ContainerInfo(ContainerMetadata(master, endian, container_type, form_type, size),  ContainerLayout(endian, "", W64_IDENTIFIER_LENGTH, W64_SIZE_LENGTH, IFF_ALIGNMENT, W64_OVERHEAD))
 
+def _read_regions(source: ReadableSource, offset: int, sizes: List[int]) -> List[bytearray]:
+    """Reads consecutive regions starting at 'offset', with a single preadv when the source has a file descriptor."""
+    buffers = [bytearray(size) for size in sizes]
+    if hasattr(os, "preadv") and hasattr(source, "fileno") and not isinstance(source, MmapSource): #: Mapped sources are already in memory.
+        read = os.preadv(source.fileno(), buffers, offset)
+    else:
+        source.seek(offset)
+        read = 0
+        for buffer in buffers:
+            data = source.read(len(buffer))
+            buffer[:len(data)] = data
+            read += len(data)
+
+    if read < sum(sizes):
+        raise EOSError(f"Not enough data to read RF64 header and 'ds64' at offset {offset}.")
+    return buffers
+
 def _parse_rf64_header(source: ReadableSource, endian: Endian, container_type: str, start: int) -> ContainerInfo:
-    return ContainerInfo()
+    header_bytes, = _read_regions(source, start, [RF64_DS64.size])
+    try:
+        header = parse_rf64_header(header_bytes)
+    except ValueError as error:
+        raise InvalidContainerError(f"RF64 source is missing a valid 'ds64' chunk at offset {start + RF64_HEADER_LENGTH}.") from error
+
+    chunk_size_storage = {"data": header.data_size}
+    if header.table_size:
+        table, = _read_regions(source, start + RF64_DS64.size, [header.table_size])
+        chunk_size_storage.update(parse_ds64_table(table))
+
+    source.seek(start + header.chunks_offset) #: Leave the source at the first chunk after 'ds64'.
+    return ContainerInfo(ContainerMetadata(header.master, endian, container_type, header.form, header.riff_size), ContainerLayout(endian, chunk_size_storage=chunk_size_storage))
 
 #: Header metadata & layout parsing.
 def derive_container_info(source: ReadableSource, start: int = 0) -> ContainerInfo:
@@ -83,7 +124,7 @@ def derive_container_info(source: ReadableSource, start: int = 0) -> ContainerIn
         return _parse_w64_header(source, endian, container_type, start)
 
     elif master == "RF64":
-        return _parse_rf64_header(source, endian, container_type, start) #: 'ds64' chunk info will not be returned since it is only useful for reading.
+        return _parse_rf64_header(source, endian, container_type, start) #: 'ds64' sizes are returned in the layout's 'chunk_size_storage'.
 
     size_bytes = source.read(IFF_SIZE_LENGTH)
     size = int.from_bytes(size_bytes, byteorder=endian)
@@ -93,37 +134,91 @@ def derive_container_info(source: ReadableSource, start: int = 0) -> ContainerIn
     return ContainerInfo(ContainerMetadata(master, endian, container_type, form_type, size), ContainerLayout(endian))
 
 #: Chunk reading functions.
-def read_chunk(source: ReadableSource, layout: ContainerLayout) -> Chunk:
-    """Read a single chunk from an IFF-based container at the current offset."""
+def _parse_identifier(identifier_bytes: bytes, layout: ContainerLayout) -> str:
+    if layout.encoding == "":
+        return guid_le_to_str(identifier_bytes)
+    return bytes(identifier_bytes).decode(LATIN)
+
+def _source_reader(source: ReadableSource) -> Callable[[int], Union[bytes, memoryview]]:
+    """Picks how fields and payloads are read: zero-copy views for mapped sources."""
+    return source.read_view if type(source) is MmapSource else source.read
+
+def read_chunk(source: ReadableSource, layout: ContainerLayout, lazy: bool = False, eos: Optional[int] = None, read: Optional[Callable[[int], Union[bytes, memoryview]]] = None) -> Chunk:
+    """
+    Read a single chunk from an IFF-based container at the current offset.
+
+    'lazy' skips over the payload; use 'Chunk.load' to read it later.
+    'eos' and 'read' can be passed when reading many chunks so they are resolved once.
+    """
+    if eos is None:
+        eos = len(source)
+    if read is None:
+        read = _source_reader(source)
+
     offset = source.tell()
-    if (offset + layout.identifier_length + layout.payload_size_length) > len(source):
+    if (offset + layout.identifier_length + layout.payload_size_length) > eos:
         raise EOSError("Not enough data to read segment identifier and size fields.")
 
-    identifier_bytes = source.read(layout.identifier_length)
-    if layout.encoding == "":
-        identifier = str(uuid.UUID(bytes_le=identifier_bytes)).upper()
+    id_len = layout.identifier_length
+    header = field_struct(layout.endian, id_len, layout.payload_size_length)
+    identifier_bytes, payload_size = header.unpack(read(header.size)) #: Identifier and size in one read and one unpack.
+    identifier = _parse_identifier(identifier_bytes, layout)
+    if payload_size == RF64_SIZE_PLACEHOLDER and layout.chunk_size_storage:
+        payload_size = layout.chunk_size_storage.get(identifier, payload_size)
+    if (offset + layout.identifier_length + layout.payload_size_length) + payload_size - layout.overhead > eos:
+       raise EOSError(f"Segment payload at offset {offset} of size {payload_size} exceeds source length {eos}.")
+
+    payload_offset = offset + id_len + layout.payload_size_length
+    payload_length = payload_size - layout.overhead
+    padding = -payload_size & (layout.alignment - 1) if layout.alignment else 0 #: Alignments are powers of two.
+    if lazy:
+        payload = None
+        source.seek(payload_length + padding, 1)
+    elif padding and payload_length < FOLD_PADDING_LIMIT and payload_offset + payload_length + padding <= eos:
+        payload = read(payload_length + padding)[:payload_length]
     else:
-        identifier = identifier_bytes.decode(LATIN)
-
-    payload_size_bytes = source.read(layout.payload_size_length)
-    payload_size = int.from_bytes(payload_size_bytes, byteorder=layout.endian) #: TODO: Some formats assign special meaning to certain size values. Account for this later.
-    if (offset + layout.identifier_length + layout.payload_size_length) + payload_size - layout.overhead > len(source):
-       raise EOSError(f"Segment payload at offset {offset} of size {payload_size} exceeds source length {len(source)}.")
-
-    payload = source.read(payload_size - layout.overhead)
-    if layout.alignment:
-        padding = (layout.alignment - (payload_size % layout.alignment)) % layout.alignment
+        payload = read(payload_length)
         if padding:
             source.seek(padding, 1)
 
-    return Chunk(identifier, payload_size, payload, offset, source.tell())
+    return Chunk(identifier, payload_size, payload, offset, payload_offset + payload_length + padding, payload_offset, payload_length)
 
-def yield_chunks(source: ReadableSource, layout: ContainerLayout):
+def yield_chunks(source: ReadableSource, layout: ContainerLayout, lazy: bool = False):
     """Yield each chunk from an IFF/RIFF-based format."""
     eos = len(source)
 
-    while (layout.identifier_length + layout.payload_size_length + source.tell() < eos):
+    if isinstance(source, (ByteSource, MmapSource)):
+        yield from _walk_chunks(source, layout, lazy)
+
+    safe_eos = eos - layout.identifier_length - layout.payload_size_length #: Offsets from here on can't fit another identifier and size.
+    tell = source.tell
+    read = _source_reader(source)
+    while (tell() < safe_eos):
         try:
-            yield read_chunk(source, layout)
+            yield read_chunk(source, layout, lazy, eos, read)
         except EOSError:
             raise
+
+def _walk_chunks(source: ReadableSource, layout: ContainerLayout, lazy: bool):
+    """Yield chunks located by `walk`, leaving the source at the offset it stopped at."""
+    buffer = source.getbuffer()
+    id_len = layout.identifier_length
+    field_size = id_len + layout.payload_size_length
+    chunks, stop_offset = walk(buffer, source.tell(), id_len, layout.payload_size_length, layout.alignment, layout.overhead, layout.endian != MMX_BE)
+
+    is_mmap = isinstance(source, MmapSource)
+    for index, (offset, payload_size) in enumerate(chunks):
+        end = chunks[index + 1][0] if index + 1 < len(chunks) else stop_offset
+        payload_offset = offset + field_size
+        payload_length = payload_size - layout.overhead
+        if lazy:
+            payload = None
+        elif is_mmap:
+            payload = buffer[payload_offset:payload_offset + payload_length]
+        else:
+            payload = bytes(buffer[payload_offset:payload_offset + payload_length])
+
+        source.seek(end) #: Keep the source where `read_chunk` would have left it.
+        yield Chunk(_parse_identifier(buffer[offset:offset + id_len], layout), payload_size, payload, offset, end, payload_offset, payload_length)
+
+    source.seek(stop_offset)
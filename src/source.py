@@ -3,13 +3,16 @@
 import mmap
 import os
 
-from io import BufferedReader, BytesIO
+from io import BufferedReader, BytesIO, FileIO
 from pathlib import Path
 from typing import Protocol, Union
 
 #: TODO: EOS checks -- if offset + size > len(source)
 #: TODO: A secondary variant that still reads as much as possible?
 
+#: Chunk parsing issues many small reads, so buffer generously to keep syscalls down.
+DEFAULT_BUFFER_SIZE = 1 << 20
+
 class Source(Protocol):
     def read(self, size: int = -1) -> bytes: ...
 
@@ -24,7 +27,9 @@ class Source(Protocol):
     def __len__(self) -> int: ...
 
 class BinarySource(Source):
-    def __init__(self, source: Union[BufferedReader, BytesIO]):
+    def __init__(self, source: Union[BufferedReader, BytesIO, FileIO], buffer_size: int = DEFAULT_BUFFER_SIZE):
+        if isinstance(source, FileIO): #: Unbuffered streams would hit a syscall per field read.
+            source = BufferedReader(source, buffer_size=buffer_size)
         self._source = source
         if isinstance(self._source, BytesIO):
             self._length = len(self._source.getbuffer())
@@ -54,6 +59,7 @@ class BinarySource(Source):
 
 class ByteSource(Source):
     def __init__(self, data: bytes):
+        self._data = data
         self._source = BytesIO(data)
         self._length = len(data)
 
@@ -67,6 +73,10 @@ class ByteSource(Source):
         self._source.seek(offset)
         return self._source.read(size)
 
+    def getbuffer(self) -> memoryview:
+        """Returns a view over the whole underlying data."""
+        return memoryview(self._data) #: `BytesIO.getbuffer` would un-share, and so copy, the data.
+
     def tell(self) -> int:
         return self._source.tell()
 
@@ -77,8 +87,8 @@ class ByteSource(Source):
         return self._length
 
 class FileSource(Source):
-    def __init__(self, fp: Union[Path, str]):
-        self._source = open(fp, "rb")
+    def __init__(self, fp: Union[Path, str], buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self._source = open(fp, "rb", buffering=buffer_size)
         self._length = os.fstat(self._source.fileno()).st_size
 
     def read(self, size: int = -1) -> bytes:
@@ -97,6 +107,9 @@ class FileSource(Source):
     def reset(self) -> None:
         self._source.seek(0)
 
+    def fileno(self) -> int:
+        return self._source.fileno()
+
     def close(self) -> None:
         self._source.close()
 
@@ -107,7 +120,10 @@ class MmapSource(Source):
     def __init__(self, fp: Union[str, Path]):
         self._file = open(fp, "rb")
         self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mv = memoryview(self._map) #: Created once; slicing it never copies.
         self._pos = 0
+        if hasattr(mmap, "MADV_SEQUENTIAL"): #: Containers are parsed front to back; let the kernel read ahead.
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
 
     def read(self, size: int = -1) -> bytes:
         if size < 0:
@@ -116,6 +132,14 @@ class MmapSource(Source):
         self._pos += size
         return self._map[start:self._pos]
 
+    def read_view(self, size: int = -1) -> memoryview:
+        """Like `read`, but returns a zero-copy view into the map."""
+        if size < 0:
+            size = len(self._map) - self._pos
+        start = self._pos
+        self._pos += size
+        return self._mv[start:self._pos]
+
     def seek(self, offset: int = 0, whence: int = 0) -> None:
         if whence == 0:  # absolute
             self._pos = offset
@@ -127,6 +151,28 @@ class MmapSource(Source):
     def read_at_offset(self, offset: int, size: int) -> bytes:
         return self._map[offset:offset + size]
 
+    def getbuffer(self) -> memoryview:
+        """Returns a view over the whole map."""
+        return self._mv
+
+    def prefetch(self, offset: int, length: int) -> None:
+        """Hints that `length` bytes from `offset` will be read soon. No-op where madvise is unavailable."""
+        if not hasattr(mmap, "MADV_WILLNEED"):
+            return
+        start = offset - (offset % mmap.PAGESIZE) #: madvise requires a page-aligned start.
+        length = min(length + (offset - start), len(self._map) - start)
+        if length > 0:
+            self._map.madvise(mmap.MADV_WILLNEED, start, length)
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self) -> None:
+        """Unmaps the file. Views handed out by `read_view` or `getbuffer` must be released first."""
+        self._mv.release()
+        self._map.close()
+        self._file.close()
+
     def tell(self) -> int:
         return self._pos
 
@@ -139,16 +185,32 @@ class MmapSource(Source):
 
 #: Source types
 ReadableSource = Union[BinarySource, ByteSource, FileSource, MmapSource]
-RawSource = Union[bytes, BytesIO, BufferedReader, Path, str, ReadableSource]
+RawSource = Union[bytes, BytesIO, BufferedReader, FileIO, Path, str, ReadableSource]
+
+#: Concrete tuple, since `isinstance` against a `Union` is comparatively slow.
+_READABLE_SOURCES = (BinarySource, ByteSource, FileSource, MmapSource)
+_STREAM_SOURCES = (BufferedReader, BytesIO, FileIO)
+
+#: Exact-type fast path for inputs that need no filesystem checks.
+_DISPATCH = {
+    bytes: ByteSource,
+    BytesIO: BinarySource,
+    BufferedReader: BinarySource,
+    FileIO: BinarySource,
+}
 
 def source_normalize(raw_source: RawSource, use_mmap: bool = False) -> ReadableSource:
-    if isinstance(raw_source, ReadableSource):
+    constructor = _DISPATCH.get(type(raw_source))
+    if constructor is not None:
+        return constructor(raw_source)
+
+    elif isinstance(raw_source, _READABLE_SOURCES):
         return raw_source
 
     elif use_mmap and isinstance(raw_source, (str, Path)):
         return MmapSource(raw_source)
 
-    elif isinstance(raw_source, (BufferedReader, BytesIO)):
+    elif isinstance(raw_source, _STREAM_SOURCES):
         return BinarySource(raw_source)
 
     elif isinstance(raw_source, bytes):
@@ -0,0 +1,27 @@
+#: src/walker.py -- walk chunk headers directly over an in-memory buffer.
+
+from typing import List, Tuple
+
+from .common import MMX_BE, MMX_LE, IFF_SIZE_LENGTH, RF64_SIZE_PLACEHOLDER, field_struct
+
+def walk(buf, start: int, identifier_length: int, payload_size_length: int, alignment: int, overhead: int, little_endian: bool) -> Tuple[List[Tuple[int, int]], int]:
+    """Walks chunk headers in `buf` from `start`, returning ([(offset, size), ...], stop_offset)."""
+    unpack_from = field_struct(MMX_LE if little_endian else MMX_BE, 0, payload_size_length).unpack_from
+    length = len(buf)
+    offset = start
+    field_size = identifier_length + payload_size_length
+    chunks = []
+
+    while offset + field_size < length:
+        size = unpack_from(buf, offset + identifier_length)[0]
+        if payload_size_length == IFF_SIZE_LENGTH and size == RF64_SIZE_PLACEHOLDER:
+            break #: The real size lives in RF64's 'ds64', which `read_chunk` resolves.
+        if size < overhead or offset + field_size + size - overhead > length:
+            break #: Leave malformed chunks to `read_chunk` so it can raise.
+
+        chunks.append((offset, size))
+        offset += field_size + size - overhead
+        if alignment:
+            offset += (alignment - (size % alignment)) % alignment
+
+    return chunks, offset
@@ -0,0 +1,35 @@
+#: tests/test_batch.py -- test batched header reads
+
+import pytest
+
+from src.batch import URING_AVAILABLE, UringBatchSource
+from src.source import ByteSource
+
+PAYLOADS = (b"RIFF0000WAVE", b"FORM0000AIFF", b"RIFX", b"")
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = []
+    for index, payload in enumerate(PAYLOADS):
+        path = tmp_path / f"header{index}"
+        path.write_bytes(payload)
+        paths.append(str(path))
+    return paths
+
+def check_headers(sources):
+    assert all(isinstance(src, ByteSource) for src in sources)
+    assert [src.read() for src in sources] == [payload[:8] for payload in PAYLOADS]
+
+def test_read_headers_preserves_order(paths):
+    check_headers(UringBatchSource(queue_depth=3).read_headers(paths, header_size=8))
+
+def test_read_headers_threaded(paths):
+    check_headers(UringBatchSource(queue_depth=3)._read_headers_threaded(paths, 8))
+
+@pytest.mark.skipif(not URING_AVAILABLE, reason="liburing is not installed")
+def test_read_headers_uring(paths):
+    check_headers(UringBatchSource(queue_depth=3)._read_headers_uring(paths, 8))
+
+def test_read_headers_missing_file(paths):
+    with pytest.raises(FileNotFoundError):
+        UringBatchSource(queue_depth=3).read_headers(paths + ["/nonexistent/mmx"], header_size=8)
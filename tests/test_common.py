@@ -0,0 +1,27 @@
+#: tests/test_common.py -- test shared helpers
+
+import os
+import uuid
+
+import pytest
+
+from src.common import MMX_BE, MMX_LE, field_struct, guid_le_to_str
+
+def test_guid_le_to_str_matches_uuid():
+    guids = [bytes(16), b"\xff" * 16, b"riff\x2e\x91\xcf\x11\xa5\xd6\x28\xdb\x04\xc1\x00\x00"] + [os.urandom(16) for _ in range(100)]
+    for guid in guids:
+        expected = str(uuid.UUID(bytes_le=guid)).upper()
+        assert guid_le_to_str(guid) == expected
+        assert guid_le_to_str(memoryview(guid)) == expected
+
+def test_guid_le_to_str_rejects_short_input():
+    for guid in (b"", b"riff" + bytes(6), bytes(15)):
+        with pytest.raises(ValueError):
+            guid_le_to_str(guid)
+
+def test_field_struct():
+    assert field_struct(MMX_BE, 16, 8).unpack(b"g" * 16 + (5).to_bytes(8, "big")) == (b"g" * 16, 5)
+    assert field_struct(MMX_LE, 0, 2).unpack((7).to_bytes(2, "little")) == (7,)
+    for endian, size_length in ((MMX_LE, 3), ("middle", 4)):
+        with pytest.raises(ValueError):
+            field_struct(endian, 4, size_length)
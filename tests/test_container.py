@@ -0,0 +1,98 @@
+#: tests/test_container.py -- test generic container reading
+
+import struct
+from io import BytesIO
+
+import pytest
+
+from src.container import ContainerStructure, EOSError, GenericContainer, RF64_STRUCTURE, RIFF_STRUCTURE, identifier_id
+from src.iff import derive_container_info
+from src.source import source_normalize
+
+def rf64(chunks, table: bytes = b"", table_length: int = 0, data_size: int = 0) -> bytes:
+    ds64 = struct.pack("<QQQI", 0, data_size, 0, table_length) + table
+    body = b"WAVE" + b"ds64" + struct.pack("<I", len(ds64)) + ds64
+    for identifier, size_field, payload in chunks:
+        body += identifier + struct.pack("<I", size_field) + payload + b"\x00" * (len(payload) % 2)
+    return b"RF64\xff\xff\xff\xff" + body
+
+def test_rf64_placeholder_sizes_resolve_from_ds64():
+    table = b"bext" + struct.pack("<Q", 99) #: Listed, but 'bext' below has a valid size field.
+    data = rf64([(b"bext", 2, b"bb"), (b"data", 0xFFFFFFFF, b"ddd")], table, 1, data_size=3)
+    container = GenericContainer(source_normalize(data), RF64_STRUCTURE)
+    master, _, form = container.read_header()
+    assert (master, form) == ("RF64", "WAVE")
+    assert [(chunk.identifier, chunk.size, chunk.payload) for chunk in (container.read_chunk(), container.read_chunk())] == [("bext", 2, b"bb"), ("data", 3, b"ddd")]
+    assert RF64_STRUCTURE.chunk_size_storage == {} #: The shared structure is left untouched.
+
+def test_rf64_header_matches_iff():
+    table = b"bext" + struct.pack("<Q", 5) + b"junk" + struct.pack("<Q", 7)
+    data = rf64([(b"data", 0xFFFFFFFF, b"ddd")], table, table_length=9, data_size=3) #: More entries claimed than 'ds64' holds.
+    container = GenericContainer(source_normalize(data), RF64_STRUCTURE)
+    container.read_header()
+    info = derive_container_info(source_normalize(data))
+    assert container._chunk_size_storage == info.layout.chunk_size_storage == {"data": 3, "bext": 5, "junk": 7}
+    assert container.read_chunk().payload == b"ddd"
+
+def riff(chunks, master: bytes = b"RIFF", size_format: str = "<I") -> bytes:
+    body = b"WAVE"
+    for identifier, payload in chunks:
+        body += identifier + struct.pack(size_format, len(payload)) + payload + b"\x00" * (len(payload) % 2)
+    return master + struct.pack(size_format, len(body) + 8) + body #: `read_all` compares absolute offsets with this size, so cover the whole source.
+
+def test_identifier_id():
+    assert identifier_id("data") == int.from_bytes(b"data", "big")
+    assert identifier_id("61746164-ACF3-11D3-8CD1-00C04F8EDB8A") == int.from_bytes(b"data", "big") #: W64 'data' GUID.
+
+@pytest.mark.parametrize("kind", ["bytes", "binary", "file", "mmap"])
+def test_read_index_matches_read_all(kind, tmp_path):
+    np = pytest.importorskip("numpy")
+    data = riff([(b"fmt ", b"x" * 16), (b"odd ", b"abc"), (b"LIST", b"")]) #: Ends in a zero-size chunk.
+    path = tmp_path / "test.wav"
+    path.write_bytes(data)
+    raw = {"bytes": data, "binary": BytesIO(data), "file": path, "mmap": path}[kind]
+
+    index = GenericContainer(source_normalize(raw, use_mmap=kind == "mmap"), RIFF_STRUCTURE).read_index()
+    chunks = GenericContainer(source_normalize(data), RIFF_STRUCTURE).read_all().chunks
+    assert index.tolist() == [(chunk.start, chunk.size, identifier_id(chunk.identifier)) for chunk in chunks]
+    assert index["off"][index["id"] == identifier_id("LIST")].tolist() == [48]
+    assert np.count_nonzero(index["id"] == identifier_id("data")) == 0
+
+def test_lazy_chunk_load():
+    data = riff([(b"fmt ", b"x" * 16), (b"odd ", b"abc")])
+    source = source_normalize(data)
+    chunks = GenericContainer(source, RIFF_STRUCTURE, lazy=True).read_all().chunks
+    assert [chunk.payload for chunk in chunks] == [None, None]
+    assert [chunk.load(source) for chunk in chunks] == [b"x" * 16, b"abc"]
+    assert chunks[1].payload == b"abc" #: Cached after loading.
+    assert source.tell() == len(data) #: Loading leaves the source where reading stopped.
+
+def test_start_offset_is_honoured():
+    prefix = b"\x00junk\x00"
+    source = source_normalize(prefix + riff([(b"fmt ", b"x" * 16)]))
+    container = GenericContainer(source, RIFF_STRUCTURE, start=len(prefix))
+    assert source.tell() == len(prefix)
+    assert container.read_header()[::2] == ("RIFF", "WAVE")
+    chunk = container.read_chunk()
+    assert (chunk.identifier, chunk.start, chunk.payload) == ("fmt ", len(prefix) + 12, b"x" * 16)
+
+    source.seek(0) #: read_all returns to `start` on its own.
+    assert [chunk.identifier for chunk in container.read_all().chunks] == ["fmt "]
+
+@pytest.mark.parametrize("data", [b"", b"RIFF\x10\x00", b"RIFF\x10\x00\x00\x00WAV"])
+def test_truncated_header(data):
+    with pytest.raises(EOSError):
+        GenericContainer(source_normalize(data), RIFF_STRUCTURE).read_all()
+
+    pytest.importorskip("numpy")
+    with pytest.raises(EOSError):
+        GenericContainer(source_normalize(data), RIFF_STRUCTURE).read_index()
+
+def test_unlisted_structures():
+    short_sizes = ContainerStructure("IFF", endian="big", payload_size_length=2)
+    data = b"FORM\x00\x0eAIFF" + b"abcd\x00\x03xyz\x00"
+    info = GenericContainer(source_normalize(data), short_sizes).read_all()
+    assert [(chunk.identifier, chunk.payload) for chunk in info.chunks] == [("abcd", b"xyz")]
+
+    with pytest.raises(ValueError):
+        GenericContainer(source_normalize(data), ContainerStructure("IFF", payload_size_length=3))
@@ -0,0 +1,99 @@
+#: tests/test_iff.py -- test iff/riff header and chunk reading
+
+import os
+import struct
+from io import BytesIO
+
+import pytest
+
+from src.common import MMX_BE
+from src.iff import ContainerLayout, EOSError, InvalidContainerError, derive_container_info, yield_chunks
+from src.source import source_normalize
+
+def rf64(data_size: int, table: bytes = b"", table_length: int = 0) -> bytes:
+    """RF64 header, 'ds64' and a 16 byte 'fmt ' chunk, ending at the 'data' chunk header."""
+    ds64 = struct.pack("<QQQI", data_size + 36 + len(table), data_size, 0, table_length) + table
+    return (b"RF64\xff\xff\xff\xffWAVE" + b"ds64" + struct.pack("<I", len(ds64)) + ds64
+            + b"fmt " + struct.pack("<I", 16) + b"\x00" * 16 + b"data\xff\xff\xff\xff")
+
+def test_rf64_oversized_data_mmap(tmp_path):
+    data_size = (1 << 32) + 10 #: Larger than a 32-bit size field can hold.
+    header = rf64(data_size)
+    path = tmp_path / "oversized.wav"
+    with path.open("wb") as fp: #: Sparse, so no real 4 GiB are written.
+        fp.write(header)
+        fp.seek(len(header) + data_size)
+        fp.write(b"LIST" + struct.pack("<I", 4) + b"INFO")
+
+    try:
+        for use_mmap in (False, True):
+            src = source_normalize(path, use_mmap=use_mmap)
+            try:
+                info = derive_container_info(src)
+                chunks = [(chunk.identifier, chunk.size) for chunk in yield_chunks(src, info.layout, lazy=True)]
+            finally:
+                src.close()
+            assert chunks == [("fmt ", 16), ("data", data_size), ("LIST", 4)]
+    finally:
+        path.unlink() #: pytest keeps recent temp directories around, so don't leave 4 GiB in them.
+
+@pytest.fixture(params=["bytes", "binary", "file", "file_no_preadv", "mmap"])
+def open_source(request, monkeypatch, tmp_path):
+    sources = []
+    def open_source(data: bytes):
+        if request.param == "bytes":
+            return source_normalize(data)
+        if request.param == "binary":
+            return source_normalize(BytesIO(data))
+        if request.param == "file_no_preadv":
+            monkeypatch.delattr(os, "preadv", raising=False)
+        path = tmp_path / f"source{len(sources)}"
+        path.write_bytes(data)
+        sources.append(source_normalize(path, use_mmap=request.param == "mmap"))
+        return sources[-1]
+    yield open_source
+    for src in sources:
+        src.close()
+
+def test_rf64_ds64_table(open_source):
+    table = b"bext" + struct.pack("<Q", 5) + b"junk" + struct.pack("<Q", 7)
+    data = rf64(3, table, table_length=2) + b"ddd\x00"
+    src = open_source(data)
+    info = derive_container_info(src)
+    assert (info.metadata.master, info.metadata.form_type, info.metadata.size) == ("RF64", "WAVE", 3 + 36 + len(table))
+    assert info.layout.chunk_size_storage == {"data": 3, "bext": 5, "junk": 7}
+    assert src.tell() == 12 + 8 + 28 + len(table) #: Left at the first chunk after 'ds64'.
+    assert [(chunk.identifier, chunk.size, bytes(chunk.payload)) for chunk in yield_chunks(src, info.layout)] == [("fmt ", 16, b"\x00" * 16), ("data", 3, b"ddd")]
+
+def test_rf64_truncated_ds64(open_source):
+    with pytest.raises(EOSError):
+        derive_container_info(open_source(rf64(3)[:30]))
+
+def test_rf64_missing_ds64(open_source):
+    with pytest.raises(InvalidContainerError):
+        derive_container_info(open_source(b"RF64\xff\xff\xff\xffWAVE" + b"fmt " + struct.pack("<I", 36) + b"\x00" * 36))
+
+def test_lazy_chunk_load(open_source):
+    data = b"RIFF" + struct.pack("<I", 26) + b"WAVE" + b"fmt " + struct.pack("<I", 3) + b"abc\x00" + b"data" + struct.pack("<I", 2) + b"yy"
+    src = open_source(data)
+    info = derive_container_info(src)
+    chunks = list(yield_chunks(src, info.layout, lazy=True))
+    assert [chunk.payload for chunk in chunks] == [None, None]
+    assert [bytes(chunk.load(src)) for chunk in chunks] == [b"abc", b"yy"]
+    assert [(chunk.start, chunk.end) for chunk in chunks] == [(12, 24), (24, 34)]
+
+def test_lazy_chunk_load_mid_iteration(open_source):
+    data = (b"RIFF" + struct.pack("<I", 46) + b"WAVE" + b"fmt " + struct.pack("<I", 3) + b"abc\x00"
+            + b"LIST" + struct.pack("<I", 4) + b"INFO" + b"data" + struct.pack("<I", 2) + b"yy")
+    src = open_source(data)
+    info = derive_container_info(src)
+    loaded = [(chunk.identifier, bytes(chunk.load(src))) for chunk in yield_chunks(src, info.layout, lazy=True)]
+    assert loaded == [("fmt ", b"abc"), ("LIST", b"INFO"), ("data", b"yy")]
+
+def test_unlisted_layouts(open_source):
+    guid_be = ContainerLayout(MMX_BE, "", identifier_length=16, payload_size_length=8, alignment=8)
+    data = bytes(range(16)) + struct.pack(">Q", 3) + b"abc" + b"\x00" * 5 + bytes(16) + struct.pack(">Q", 1) + b"z"
+    assert [(chunk.size, bytes(chunk.payload)) for chunk in yield_chunks(open_source(data), guid_be)] == [(3, b"abc"), (1, b"z")]
+
+    short_sizes = ContainerLayout(MMX_BE, payload_size_length=2)
+    assert [(chunk.identifier, bytes(chunk.payload)) for chunk in yield_chunks(open_source(b"abcd\x00\x02xy"), short_sizes)] == [("abcd", b"xy")]
@@ -2,7 +2,7 @@
 
 import os
 import tempfile
-from io import BytesIO
+from io import BufferedReader, BytesIO
 from pathlib import Path
 
 import pytest
@@ -109,3 +109,40 @@ def test_read_at_offset_operation(source):
     #: read_at_offset might imply that absolute seek is used
     assert source.read_at_offset(0, 4) == TEST_DATA[:4]
     assert source.read_at_offset(4, 4) == TEST_DATA[4:]
+
+def test_unbuffered_stream_is_buffered(tmp_path):
+    path = tmp_path / "source"
+    path.write_bytes(TEST_DATA)
+    with path.open("rb", buffering=0) as stream:
+        src = source_normalize(stream)
+        assert isinstance(src, BinarySource)
+        assert isinstance(src._source, BufferedReader)
+        assert len(src) == len(TEST_DATA)
+        assert src.read(4) == TEST_DATA[:4]
+
+def test_mmap_read_view(tmp_path):
+    path = tmp_path / "source"
+    path.write_bytes(TEST_DATA)
+    src = source_normalize(path, use_mmap=True)
+    with src.read_view(4) as view:
+        assert isinstance(view, memoryview)
+        assert view == TEST_DATA[:4]
+    assert src.tell() == 4
+    with src.read_view() as view:
+        assert view == TEST_DATA[4:]
+    src.close()
+
+def test_mmap_prefetch(tmp_path):
+    path = tmp_path / "source"
+    path.write_bytes(TEST_DATA)
+    src = source_normalize(path, use_mmap=True)
+    src.prefetch(4, 999) #: Clamped to the map and never moves the position.
+    assert src.tell() == 0
+    assert src.read() == TEST_DATA
+    src.close()
+
+def test_bytes_getbuffer_shares_data():
+    src = source_normalize(TEST_DATA)
+    view = src.getbuffer()
+    assert view.obj is TEST_DATA
+    assert view == TEST_DATA
@@ -0,0 +1,15 @@
+#: tests/test_walker.py -- test walking chunk headers over a buffer
+
+from src.walker import walk
+
+CHUNKS = b"fmt \x03\x00\x00\x00abc\x00data\x02\x00\x00\x00yy"
+
+def test_walk_finds_chunks():
+    chunks, stop_offset = walk(CHUNKS, 0, 4, 4, 2, 0, True)
+    assert chunks == [(0, 3), (12, 2)]
+    assert stop_offset == len(CHUNKS)
+
+def test_walk_stops_at_truncated_payload():
+    chunks, stop_offset = walk(CHUNKS[:-1], 0, 4, 4, 2, 0, True)
+    assert chunks == [(0, 3)]
+    assert stop_offset == 12